@@ -1,5 +1,7 @@
+import functools
 import itertools
 import os
+from collections import namedtuple
 from collections.abc import Mapping, Sequence
 from copy import copy
 
@@ -7,10 +9,21 @@ import sqlalchemy as sa
 from sqlalchemy.engine.url import make_url
 from sqlalchemy.exc import OperationalError, ProgrammingError
 
-from ..utils import starts_with
 from .orm import quote
 
 
+@functools.lru_cache(maxsize=8)
+def _escape_table(escape_char):
+    return str.maketrans({
+        escape_char: escape_char * 2,
+        '%': escape_char + '%',
+        '_': escape_char + '_',
+    })
+
+
+_DEFAULT_ESCAPE_TABLE = _escape_table('*')
+
+
 def escape_like(string, escape_char='*'):
     """
     Escape the string parameter used in SQL LIKE expressions.
@@ -28,12 +41,91 @@ def escape_like(string, escape_char='*'):
     :param string: a string to escape
     :param escape_char: escape character
     """
-    return (
-        string
-        .replace(escape_char, escape_char * 2)
-        .replace('%', escape_char + '%')
-        .replace('_', escape_char + '_')
-    )
+    if not (escape_char in string or '%' in string or '_' in string):
+        return string
+    if escape_char == '*':
+        return string.translate(_DEFAULT_ESCAPE_TABLE)
+    if len(escape_char) != 1:
+        # Translation tables only map single characters.
+        return (
+            string
+            .replace(escape_char, escape_char * 2)
+            .replace('%', escape_char + '%')
+            .replace('_', escape_char + '_')
+        )
+    return string.translate(_escape_table(escape_char))
+
+
+_JSONFunctions = namedtuple(
+    '_JSONFunctions',
+    ['to_json', 'build_object', 'build_array']
+)
+
+_JSON_FUNCTIONS = _JSONFunctions(
+    sa.func.to_json,
+    sa.func.json_build_object,
+    sa.func.json_build_array
+)
+
+_JSONB_FUNCTIONS = _JSONFunctions(
+    sa.func.to_jsonb,
+    sa.func.jsonb_build_object,
+    sa.func.jsonb_build_array
+)
+
+
+def _json_scalar(text, functions, convert_scalars):
+    scalar = sa.text(text)
+    return functions.to_json(scalar) if convert_scalars else scalar
+
+
+def _json_string(value, functions, convert_scalars):
+    return _json_scalar(f"'{value}'", functions, convert_scalars)
+
+
+def _json_number(value, functions, convert_scalars):
+    return _json_scalar(str(value), functions, convert_scalars)
+
+
+def _json_object(value, functions, convert_scalars):
+    return functions.build_object(*[
+        _json_sql(v, functions, False)
+        for v in itertools.chain.from_iterable(value.items())
+    ])
+
+
+def _json_array(value, functions, convert_scalars):
+    return functions.build_array(*[
+        _json_sql(v, functions, False) for v in value
+    ])
+
+
+# Exact type lookup for the common concrete types, avoiding ABC instance
+# checks for every node of the converted structure.
+_JSON_HANDLERS = {
+    dict: _json_object,
+    str: _json_string,
+    list: _json_array,
+    tuple: _json_array,
+    int: _json_number,
+    float: _json_number,
+}
+
+
+def _json_sql(value, functions, convert_scalars):
+    handler = _JSON_HANDLERS.get(type(value))
+    if handler is None:
+        if isinstance(value, Mapping):
+            handler = _json_object
+        elif isinstance(value, str):
+            handler = _json_string
+        elif isinstance(value, Sequence):
+            handler = _json_array
+        elif isinstance(value, (int, float)):
+            handler = _json_number
+        else:
+            return value
+    return handler(value, functions, convert_scalars)
 
 
 def json_sql(value, scalars_to_json=True):
@@ -80,31 +172,7 @@ def json_sql(value, scalars_to_json=True):
     :param value:
         value to be converted to SQLAlchemy PostgreSQL function constructs
     """
-    if scalars_to_json:
-        def scalar_convert(a):
-            return sa.func.to_json(sa.text(a))
-    else:
-        scalar_convert = sa.text
-
-    if isinstance(value, Mapping):
-        return sa.func.json_build_object(
-            *(
-                json_sql(v, scalars_to_json=False)
-                for v in itertools.chain(*value.items())
-            )
-        )
-    elif isinstance(value, str):
-        return scalar_convert(f"'{value}'")
-    elif isinstance(value, Sequence):
-        return sa.func.json_build_array(
-            *(
-                json_sql(v, scalars_to_json=False)
-                for v in value
-            )
-        )
-    elif isinstance(value, (int, float)):
-        return scalar_convert(str(value))
-    return value
+    return _json_sql(value, _JSON_FUNCTIONS, scalars_to_json)
 
 
 def jsonb_sql(value, scalars_to_jsonb=True):
@@ -153,31 +221,68 @@ def jsonb_sql(value, scalars_to_jsonb=True):
     :boolean jsonbb:
         Flag to alternatively convert the return with a to_jsonb construct
     """
-    if scalars_to_jsonb:
-        def scalar_convert(a):
-            return sa.func.to_jsonb(sa.text(a))
-    else:
-        scalar_convert = sa.text
-
-    if isinstance(value, Mapping):
-        return sa.func.jsonb_build_object(
-            *(
-                jsonb_sql(v, scalars_to_jsonb=False)
-                for v in itertools.chain(*value.items())
-            )
-        )
-    elif isinstance(value, str):
-        return scalar_convert(f"'{value}'")
-    elif isinstance(value, Sequence):
-        return sa.func.jsonb_build_array(
-            *(
-                jsonb_sql(v, scalars_to_jsonb=False)
-                for v in value
-            )
-        )
-    elif isinstance(value, (int, float)):
-        return scalar_convert(str(value))
-    return value
+    return _json_sql(value, _JSONB_FUNCTIONS, scalars_to_jsonb)
+
+
+def _same_objects(a, b):
+    return len(a) == len(b) and all(x is y for x, y in zip(a, b))
+
+
+def _index_keys(table):
+    """
+    Return a tuple of two sets of column key tuples for given table: every
+    leading prefix of the primary key and of each index, and the full keys of
+    the primary key and of each unique index or unique constraint.
+
+    The sets are cached on the table and rebuilt whenever the indexes,
+    constraints or primary key columns of the table have changed.
+    """
+    # The cache lives on the table itself, so holding on to its indexes and
+    # constraints does not keep the table alive. Comparing the objects by
+    # identity rules out stale hits from reused ids.
+    state = (
+        tuple(table.indexes),
+        tuple(table.constraints),
+        tuple(table.primary_key.columns)
+    )
+    cached = getattr(table, '_sqlalchemy_utils_index_keys', None)
+    if cached is not None:
+        cached_state, keys = cached
+        if all(map(_same_objects, cached_state, state)):
+            return keys
+
+    def key_tuple(columns):
+        return tuple(c.key for c in columns)
+
+    primary_keys = key_tuple(table.primary_key.columns)
+    prefixes = set()
+    for columns in itertools.chain(
+        [primary_keys],
+        (key_tuple(index.columns) for index in table.indexes)
+    ):
+        prefixes.update(columns[:i] for i in range(1, len(columns) + 1))
+
+    unique_keys = {primary_keys}
+    unique_keys.update(
+        key_tuple(constraint.columns)
+        for constraint in table.constraints
+        if isinstance(constraint, sa.sql.schema.UniqueConstraint)
+    )
+    unique_keys.update(
+        key_tuple(index.columns)
+        for index in table.indexes
+        if index.unique
+    )
+
+    keys = (prefixes, unique_keys)
+    table._sqlalchemy_utils_index_keys = (state, keys)
+    return keys
+
+
+def _column_keys(column_or_constraint):
+    if isinstance(column_or_constraint, sa.ForeignKeyConstraint):
+        return tuple(c.key for c in column_or_constraint.columns)
+    return (column_or_constraint.key,)
 
 
 def has_index(column_or_constraint):
@@ -275,24 +380,14 @@ def has_index(column_or_constraint):
         has_index(constraint)  # True
     """
     table = column_or_constraint.table
-    if not isinstance(table, sa.Table):
+    if type(table) is not sa.Table and not isinstance(table, sa.Table):
         raise TypeError(
             'Only columns belonging to Table objects are supported. Given '
             'column belongs to %r.' % table
         )
-    primary_keys = table.primary_key.columns.values()
-    if isinstance(column_or_constraint, sa.ForeignKeyConstraint):
-        columns = list(column_or_constraint.columns.values())
-    else:
-        columns = [column_or_constraint]
-
-    return (
-        (primary_keys and starts_with(primary_keys, columns)) or
-        any(
-            starts_with(index.columns.values(), columns)
-            for index in table.indexes
-        )
-    )
+    keys = _column_keys(column_or_constraint)
+    prefixes, _ = _index_keys(table)
+    return keys in prefixes
 
 
 def has_unique_index(column_or_constraint):
@@ -375,30 +470,14 @@ def has_unique_index(column_or_constraint):
     :raises TypeError: if given column does not belong to a Table object
     """
     table = column_or_constraint.table
-    if not isinstance(table, sa.Table):
+    if type(table) is not sa.Table and not isinstance(table, sa.Table):
         raise TypeError(
             'Only columns belonging to Table objects are supported. Given '
             'column belongs to %r.' % table
         )
-    primary_keys = list(table.primary_key.columns.values())
-    if isinstance(column_or_constraint, sa.ForeignKeyConstraint):
-        columns = list(column_or_constraint.columns.values())
-    else:
-        columns = [column_or_constraint]
-
-    return (
-        (columns == primary_keys) or
-        any(
-            columns == list(constraint.columns.values())
-            for constraint in table.constraints
-            if isinstance(constraint, sa.sql.schema.UniqueConstraint)
-        ) or
-        any(
-            columns == list(index.columns.values())
-            for index in table.indexes
-            if index.unique
-        )
-    )
+    keys = _column_keys(column_or_constraint)
+    _, unique_keys = _index_keys(table)
+    return keys in unique_keys
 
 
 def is_auto_assigned_date_column(column):
@@ -429,6 +508,8 @@ def _set_url_database(url: sa.engine.url.URL, database):
     :param database: New database to set.
 
     """
+    if url.database == database:
+        return url
     if hasattr(url, '_replace'):
         # Cannot use URL.set() as database may need to be set to None.
         ret = url._replace(database=database)
@@ -440,19 +521,52 @@ def _set_url_database(url: sa.engine.url.URL, database):
     return ret
 
 
-def _get_scalar_result(engine, sql):
+# Drivers that need an AUTOCOMMIT connection to create or drop a database.
+_MSSQL_AUTOCOMMIT_DRIVERS = frozenset({'pymssql', 'pyodbc'})
+
+_PG_AUTOCOMMIT_DRIVERS = frozenset({
+    'asyncpg',
+    'pg8000',
+    'psycopg',
+    'psycopg2',
+    'psycopg2cffi'
+})
+
+
+_SELECT_ONE = sa.text('SELECT 1')
+
+_PG_DATABASE_EXISTS = sa.text(
+    'SELECT 1 FROM pg_database WHERE datname = :database'
+)
+
+_MYSQL_DATABASE_EXISTS = sa.text(
+    'SELECT SCHEMA_NAME FROM INFORMATION_SCHEMA.SCHEMATA '
+    'WHERE SCHEMA_NAME = :database'
+)
+
+_MSSQL_DATABASE_EXISTS = sa.text(
+    'SELECT 1 FROM sys.databases WHERE name = :database'
+)
+
+_SQLITE_CREATE_PROBE = sa.text('CREATE TABLE DB(id int)')
+
+_SQLITE_DROP_PROBE = sa.text('DROP TABLE DB')
+
+
+def _get_scalar_result(engine, sql, params=None):
     with engine.connect() as conn:
-        return conn.scalar(sql)
+        return conn.scalar(sql, params or {})
 
 
 def _sqlite_file_exists(database):
-    if not os.path.isfile(database) or os.path.getsize(database) < 100:
+    # Opening a FIFO or device could block, so only regular files are read.
+    if not os.path.isfile(database):
         return False
 
     with open(database, 'rb') as f:
         header = f.read(100)
 
-    return header[:16] == b'SQLite format 3\x00'
+    return len(header) == 100 and header[:16] == b'SQLite format 3\x00'
 
 
 def database_exists(url):
@@ -482,22 +596,35 @@ def database_exists(url):
     engine = None
     try:
         if dialect_name == 'postgresql':
-            text = "SELECT 1 FROM pg_database WHERE datname='%s'" % database
             for db in (database, 'postgres', 'template1', 'template0', None):
                 url = _set_url_database(url, database=db)
-                engine = sa.create_engine(url, isolation_level='AUTOCOMMIT')
+                # Each candidate is tried with a single connection; NullPool
+                # closes it right away instead of keeping a pool around.
+                candidate_engine = sa.create_engine(
+                    url,
+                    isolation_level='AUTOCOMMIT',
+                    poolclass=sa.pool.NullPool
+                )
                 try:
-                    return bool(_get_scalar_result(engine, sa.text(text)))
+                    return bool(_get_scalar_result(
+                        candidate_engine,
+                        _PG_DATABASE_EXISTS,
+                        {'database': database}
+                    ))
                 except (ProgrammingError, OperationalError):
                     pass
+                finally:
+                    candidate_engine.dispose()
             return False
 
         elif dialect_name == 'mysql':
             url = _set_url_database(url, database=None)
             engine = sa.create_engine(url)
-            text = ("SELECT SCHEMA_NAME FROM INFORMATION_SCHEMA.SCHEMATA "
-                    "WHERE SCHEMA_NAME = '%s'" % database)
-            return bool(_get_scalar_result(engine, sa.text(text)))
+            return bool(_get_scalar_result(
+                engine,
+                _MYSQL_DATABASE_EXISTS,
+                {'database': database}
+            ))
 
         elif dialect_name == 'sqlite':
             url = _set_url_database(url, database=None)
@@ -509,18 +636,20 @@ def database_exists(url):
                 # not required, thus we should support that use case.
                 return True
         elif dialect_name == 'mssql':
-            text = "SELECT 1 FROM sys.databases WHERE name = '%s'" % database
             url = _set_url_database(url, database='master')
             engine = sa.create_engine(url, isolation_level='AUTOCOMMIT')
             try:
-                return bool(_get_scalar_result(engine, sa.text(text)))
+                return bool(_get_scalar_result(
+                    engine,
+                    _MSSQL_DATABASE_EXISTS,
+                    {'database': database}
+                ))
             except (ProgrammingError, OperationalError):
                 return False
         else:
-            text = 'SELECT 1'
             try:
                 engine = sa.create_engine(url)
-                return bool(_get_scalar_result(engine, sa.text(text)))
+                return bool(_get_scalar_result(engine, _SELECT_ONE))
             except (ProgrammingError, OperationalError):
                 return False
     finally:
@@ -528,6 +657,163 @@ def database_exists(url):
             engine.dispose()
 
 
+def _execute_ddl(conn, statement):
+    # Statements built only from quote()d identifiers need no bound
+    # parameters. Passing them straight to the DBAPI skips text() parsing,
+    # and no_parameters stops pyformat drivers from treating any "%" in a
+    # quoted name as a placeholder.
+    conn.exec_driver_sql(statement, execution_options={'no_parameters': True})
+
+
+def _create_postgresql(engine, database, encoding, template):
+    if not template:
+        template = 'template1'
+
+    with engine.begin() as conn:
+        text = "CREATE DATABASE {} ENCODING '{}' TEMPLATE {}".format(
+            quote(conn, database),
+            encoding,
+            quote(conn, template)
+        )
+        conn.execute(sa.text(text))
+
+
+def _create_mysql(engine, database, encoding, template):
+    with engine.begin() as conn:
+        text = "CREATE DATABASE {} CHARACTER SET = '{}'".format(
+            quote(conn, database),
+            encoding
+        )
+        conn.execute(sa.text(text))
+
+
+def _create_sqlite(engine, database, encoding, template):
+    # In-memory databases are created along with their first connection.
+    if database and database != ':memory:':
+        with engine.begin() as conn:
+            conn.execute(_SQLITE_CREATE_PROBE)
+            conn.execute(_SQLITE_DROP_PROBE)
+
+
+def _create_database(engine, database, encoding, template):
+    with engine.begin() as conn:
+        text = f'CREATE DATABASE {quote(conn, database)}'
+        conn.execute(sa.text(text))
+
+
+_PG_TERMINATE_BACKENDS_SQL = '''
+SELECT pg_terminate_backend(pg_stat_activity.{pid_column})
+FROM pg_stat_activity
+WHERE pg_stat_activity.datname = :database
+AND {pid_column} <> pg_backend_pid()
+{backend_type};
+'''
+
+# Only client backends can be connected to the database; skipping background
+# workers avoids pointless signals. backend_type exists since PostgreSQL 10.
+_PG_TERMINATE_BACKENDS = sa.text(_PG_TERMINATE_BACKENDS_SQL.format(
+    pid_column='pid',
+    backend_type="AND backend_type = 'client backend'"
+))
+
+_PG_TERMINATE_BACKENDS_9_2 = sa.text(_PG_TERMINATE_BACKENDS_SQL.format(
+    pid_column='pid',
+    backend_type=''
+))
+
+_PG_TERMINATE_BACKENDS_LEGACY = sa.text(_PG_TERMINATE_BACKENDS_SQL.format(
+    pid_column='procpid',
+    backend_type=''
+))
+
+
+def _pg_terminate_backends(version):
+    if version >= (10, 0):
+        return _PG_TERMINATE_BACKENDS
+    elif version >= (9, 2):
+        return _PG_TERMINATE_BACKENDS_9_2
+    return _PG_TERMINATE_BACKENDS_LEGACY
+
+
+def _drop_postgresql(engine, database):
+    with engine.begin() as conn:
+        version = conn.dialect.server_version_info
+        if version >= (13, 0):
+            # Let the server disconnect all users of the database as part of
+            # dropping it.
+            _execute_ddl(
+                conn,
+                f'DROP DATABASE {quote(conn, database)} WITH (FORCE)'
+            )
+        else:
+            # Disconnect all users from the database we are dropping.
+            conn.execute(
+                _pg_terminate_backends(version),
+                {'database': database}
+            )
+
+            # Drop the database.
+            _execute_ddl(conn, f'DROP DATABASE {quote(conn, database)}')
+
+
+def _drop_sqlite(engine, database):
+    # In-memory databases vanish with their last connection.
+    if database and database != ':memory:':
+        os.unlink(database)
+        # Leftover journal files would be replayed into a database later
+        # created at the same path.
+        for suffix in ('-wal', '-shm', '-journal'):
+            try:
+                os.unlink(database + suffix)
+            except FileNotFoundError:
+                pass
+
+
+def _drop_database(engine, database):
+    with engine.begin() as conn:
+        _execute_ddl(conn, f'DROP DATABASE {quote(conn, database)}')
+
+
+_DialectConfig = namedtuple(
+    '_DialectConfig',
+    ['maintenance_database', 'autocommit_drivers', 'create', 'drop']
+)
+
+# Marks dialects that create and drop databases through a connection to the
+# database itself rather than to a separate maintenance database.
+_OWN_DATABASE = object()
+
+_DIALECTS = {
+    'cockroachdb': _DialectConfig(
+        'defaultdb', frozenset(), _create_database, _drop_database
+    ),
+    'mssql': _DialectConfig(
+        'master', _MSSQL_AUTOCOMMIT_DRIVERS, _create_database, _drop_database
+    ),
+    'mysql': _DialectConfig(
+        None, frozenset(), _create_mysql, _drop_database
+    ),
+    'postgresql': _DialectConfig(
+        'postgres', _PG_AUTOCOMMIT_DRIVERS, _create_postgresql, _drop_postgresql
+    ),
+    'sqlite': _DialectConfig(
+        _OWN_DATABASE, frozenset(), _create_sqlite, _drop_sqlite
+    ),
+}
+
+_DEFAULT_DIALECT = _DialectConfig(
+    None, frozenset(), _create_database, _drop_database
+)
+
+
+def _maintenance_engine(url, config, dialect_driver):
+    if config.maintenance_database is not _OWN_DATABASE:
+        url = _set_url_database(url, database=config.maintenance_database)
+    if dialect_driver in config.autocommit_drivers:
+        return sa.create_engine(url, isolation_level='AUTOCOMMIT')
+    return sa.create_engine(url)
+
+
 def create_database(url, encoding='utf8', template=None):
     """Issue the appropriate CREATE DATABASE statement.
 
@@ -552,57 +838,14 @@ def create_database(url, encoding='utf8', template=None):
 
     url = make_url(url)
     database = url.database
-    dialect_name = url.get_dialect().name
-    dialect_driver = url.get_dialect().driver
-
-    if dialect_name == 'postgresql':
-        url = _set_url_database(url, database="postgres")
-    elif dialect_name == 'mssql':
-        url = _set_url_database(url, database="master")
-    elif dialect_name == 'cockroachdb':
-        url = _set_url_database(url, database="defaultdb")
-    elif not dialect_name == 'sqlite':
-        url = _set_url_database(url, database=None)
-
-    if (dialect_name == 'mssql' and dialect_driver in {'pymssql', 'pyodbc'}) \
-            or (dialect_name == 'postgresql' and dialect_driver in {
-            'asyncpg', 'pg8000', 'psycopg', 'psycopg2', 'psycopg2cffi'}):
-        engine = sa.create_engine(url, isolation_level='AUTOCOMMIT')
-    else:
-        engine = sa.create_engine(url)
-
-    if dialect_name == 'postgresql':
-        if not template:
-            template = 'template1'
-
-        with engine.begin() as conn:
-            text = "CREATE DATABASE {} ENCODING '{}' TEMPLATE {}".format(
-                quote(conn, database),
-                encoding,
-                quote(conn, template)
-            )
-            conn.execute(sa.text(text))
+    dialect = url.get_dialect()
+    config = _DIALECTS.get(dialect.name, _DEFAULT_DIALECT)
 
-    elif dialect_name == 'mysql':
-        with engine.begin() as conn:
-            text = "CREATE DATABASE {} CHARACTER SET = '{}'".format(
-                quote(conn, database),
-                encoding
-            )
-            conn.execute(sa.text(text))
-
-    elif dialect_name == 'sqlite' and database != ':memory:':
-        if database:
-            with engine.begin() as conn:
-                conn.execute(sa.text('CREATE TABLE DB(id int)'))
-                conn.execute(sa.text('DROP TABLE DB'))
-
-    else:
-        with engine.begin() as conn:
-            text = f'CREATE DATABASE {quote(conn, database)}'
-            conn.execute(sa.text(text))
-
-    engine.dispose()
+    engine = _maintenance_engine(url, config, dialect.driver)
+    try:
+        config.create(engine, database, encoding, template)
+    finally:
+        engine.dispose()
 
 
 def drop_database(url):
@@ -622,29 +865,11 @@ def drop_database(url):
 
     url = make_url(url)
     database = url.database
-    dialect_name = url.get_dialect().name
-    dialect_driver = url.get_dialect().driver
-
-    if dialect_name == 'postgresql':
-        url = _set_url_database(url, database="postgres")
-    elif dialect_name == 'mssql':
-        url = _set_url_database(url, database="master")
-    elif dialect_name == 'cockroachdb':
-        url = _set_url_database(url, database="defaultdb")
-    elif not dialect_name == 'sqlite':
-        url = _set_url_database(url, database=None)
-
-    if (dialect_name == 'mssql' and dialect_driver in {'pymssql', 'pyodbc'}) \
-            or (dialect_name == 'postgresql' and dialect_driver in {
-            'asyncpg', 'pg8000', 'psycopg', 'psycopg2', 'psycopg2cffi'}):
-        engine = sa.create_engine(url, isolation_level='AUTOCOMMIT')
-    else:
-        engine = sa.create_engine(url)
-
-    if dialect_name == 'sqlite' and database != ':memory:':
-        if database:
-            os.remove(database)
-    else:
-        with engine.begin() as conn:
-            text = f'DROP DATABASE {quote(conn, database)}'
-            conn.execute(sa.text(text))
+    dialect = url.get_dialect()
+    config = _DIALECTS.get(dialect.name, _DEFAULT_DIALECT)
+
+    engine = _maintenance_engine(url, config, dialect.driver)
+    try:
+        config.drop(engine, database)
+    finally:
+        engine.dispose()
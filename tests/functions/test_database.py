@@ -1,8 +1,13 @@
+import os
+from contextlib import contextmanager
+
 import pytest
 import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
 
 from sqlalchemy_utils import create_database, database_exists, drop_database
 from sqlalchemy_utils.compat import get_sqlalchemy_version
+from sqlalchemy_utils.functions.database import _drop_postgresql
 
 pymysql = None
 try:
@@ -22,12 +27,32 @@ class DatabaseTest:
         assert not database_exists(dsn)
 
 
+class DropWithOpenConnectionTest:
+    def test_drop_with_open_connection(self, dsn):
+        create_database(dsn)
+        engine = sa.create_engine(dsn)
+        conn = engine.connect()
+        conn.execute(sa.text('SELECT 1'))
+        drop_database(dsn)
+        assert not database_exists(dsn)
+        conn.invalidate()
+        engine.dispose()
+
+
 @pytest.mark.usefixtures('sqlite_memory_dsn')
 class TestDatabaseSQLiteMemory:
 
     def test_exists_memory(self, dsn):
         assert database_exists(dsn)
 
+    def test_create_memory(self, dsn):
+        create_database(dsn)
+        assert database_exists(dsn)
+
+    def test_drop_memory(self, dsn):
+        drop_database(dsn)
+        assert database_exists(dsn)
+
 
 @pytest.mark.usefixtures('sqlite_none_database_dsn')
 class TestDatabaseSQLiteMemoryNoDatabaseString:
@@ -42,6 +67,24 @@ class TestDatabaseSQLiteFile(DatabaseTest):
         open(database, 'w').close()
         self.test_create_and_drop(dsn)
 
+    def test_exists_directory(self, tmp_path):
+        assert not database_exists(f'sqlite:///{tmp_path}')
+
+    @pytest.mark.skipif('not hasattr(os, "mkfifo")')
+    def test_exists_fifo(self, tmp_path):
+        fifo = tmp_path / 'fifo.db'
+        os.mkfifo(fifo)
+        assert not database_exists(f'sqlite:///{fifo}')
+
+    def test_drop_removes_journal_files(self, dsn):
+        database = sa.engine.url.make_url(dsn).database
+        create_database(dsn)
+        for suffix in ('-wal', '-shm', '-journal'):
+            open(database + suffix, 'w').close()
+        drop_database(dsn)
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            assert not os.path.exists(database + suffix)
+
 
 @pytest.mark.skipif('pymysql is None')
 @pytest.mark.usefixtures('mysql_dsn')
@@ -62,7 +105,7 @@ class TestDatabaseMySQLWithQuotedName(DatabaseTest):
 
 
 @pytest.mark.usefixtures('postgresql_dsn')
-class TestDatabasePostgres(DatabaseTest):
+class TestDatabasePostgres(DatabaseTest, DropWithOpenConnectionTest):
 
     @pytest.fixture
     def db_name(self):
@@ -79,6 +122,60 @@ class TestDatabasePostgres(DatabaseTest):
                 "TEMPLATE my_template") in str(excinfo.value)
 
 
+class TestDropPostgresqlStatements:
+
+    class Connection:
+        def __init__(self, server_version_info):
+            self.dialect = postgresql.dialect()
+            self.dialect.server_version_info = server_version_info
+            self.statements = []
+
+        def execute(self, statement, parameters=None):
+            self.statements.append(' '.join(str(statement).split()))
+
+        def exec_driver_sql(self, statement, execution_options=None):
+            self.statements.append(statement)
+
+    class Engine:
+        def __init__(self, connection):
+            self.connection = connection
+
+        @contextmanager
+        def begin(self):
+            yield self.connection
+
+    def drop(self, server_version_info):
+        connection = self.Connection(server_version_info)
+        _drop_postgresql(self.Engine(connection), 'db')
+        return connection.statements
+
+    def test_force(self):
+        assert self.drop((13, 0)) == ['DROP DATABASE db WITH (FORCE)']
+
+    @pytest.mark.parametrize(
+        ('server_version_info', 'pid_column', 'backend_type'),
+        (
+            ((12, 4), 'pid', True),
+            ((10, 0), 'pid', True),
+            ((9, 6), 'pid', False),
+            ((9, 2), 'pid', False),
+            ((9, 1), 'procpid', False),
+        )
+    )
+    def test_terminate_backends(
+        self,
+        server_version_info,
+        pid_column,
+        backend_type
+    ):
+        terminate, drop = self.drop(server_version_info)
+        assert (
+            f'pg_terminate_backend(pg_stat_activity.{pid_column})' in terminate
+        )
+        assert ("backend_type = 'client backend'" in terminate) == backend_type
+        assert drop == 'DROP DATABASE db'
+
+
 class TestDatabasePostgresPg8000(DatabaseTest):
 
     @pytest.fixture
@@ -4,3 +4,12 @@ from sqlalchemy_utils import escape_like
 class TestEscapeLike:
     def test_escapes_wildcards(self):
         assert escape_like('_*%') == '*_***%'
+
+    def test_custom_escape_char(self):
+        assert escape_like('_!%', '!') == '!_!!!%'
+
+    def test_without_wildcards(self):
+        assert escape_like('John') == 'John'
+
+    def test_multi_character_escape(self):
+        assert escape_like('a_b', '!!') == 'a!!_b'
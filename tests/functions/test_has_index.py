@@ -1,3 +1,5 @@
+import gc
+
 import pytest
 import sqlalchemy as sa
 
@@ -38,6 +40,56 @@ class TestHasIndex:
         assert has_index(table.c.is_deleted)
         assert not has_index(table.c.is_archived)
 
+    def test_index_added_after_check(self, table):
+        assert not has_index(table.c.title)
+        sa.Index('title_index', table.c.title)
+        assert has_index(table.c.title)
+
+    def test_index_replaced_after_check(self, table):
+        index = next(i for i in table.indexes if i.name == 'my_index')
+        assert not has_index(table.c.title)
+        table.indexes.discard(index)
+        sa.Index('title_index', table.c.title)
+        assert has_index(table.c.title)
+        assert not has_index(table.c.is_deleted)
+
+    def test_index_replaced_after_check_and_collected(self):
+        article = sa.Table(
+            'article',
+            sa.MetaData(),
+            sa.Column('id', sa.Integer, primary_key=True),
+            sa.Column('title', sa.String),
+            sa.Column('body', sa.String)
+        )
+        for _ in range(20):
+            index = sa.Index('title_index', article.c.title)
+            assert has_index(article.c.title)
+            assert not has_index(article.c.body)
+            article.indexes.discard(index)
+            del index
+            gc.collect()
+            index = sa.Index('body_index', article.c.body)
+            assert not has_index(article.c.title)
+            assert has_index(article.c.body)
+            article.indexes.discard(index)
+            del index
+            gc.collect()
+
+    def test_primary_key_replaced_after_check(self):
+        article = sa.Table(
+            'article',
+            sa.MetaData(),
+            sa.Column('id', sa.Integer, primary_key=True),
+            sa.Column('name', sa.String)
+        )
+        assert not has_index(article.c.name)
+        with pytest.warns(sa.exc.SAWarning):
+            article.append_constraint(
+                sa.PrimaryKeyConstraint(article.c.name)
+            )
+        assert has_index(article.c.name)
+        assert not has_index(article.c.id)
+
     def test_table_without_primary_key(self):
         article = sa.Table(
             'article',
@@ -1,3 +1,5 @@
+import gc
+
 import pytest
 import sqlalchemy as sa
 
@@ -41,6 +43,46 @@ class TestHasUniqueIndex:
     def test_unique_index(self, article_translations):
         assert has_unique_index(article_translations.c.is_deleted)
 
+    def test_unique_constraint_added_after_check(self, article_translations):
+        assert not has_unique_index(article_translations.c.title)
+        article_translations.append_constraint(
+            sa.UniqueConstraint(article_translations.c.title)
+        )
+        assert has_unique_index(article_translations.c.title)
+
+    def test_primary_key_replaced_after_check(self):
+        article = sa.Table(
+            'article',
+            sa.MetaData(),
+            sa.Column('id', sa.Integer, primary_key=True),
+            sa.Column('name', sa.String)
+        )
+        assert not has_unique_index(article.c.name)
+        with pytest.warns(sa.exc.SAWarning):
+            article.append_constraint(
+                sa.PrimaryKeyConstraint(article.c.name)
+            )
+        assert has_unique_index(article.c.name)
+        assert not has_unique_index(article.c.id)
+
+    def test_unique_constraint_replaced_after_check_and_collected(self):
+        article = sa.Table(
+            'article',
+            sa.MetaData(),
+            sa.Column('id', sa.Integer, primary_key=True),
+            sa.Column('name', sa.String),
+            sa.Column('slug', sa.String)
+        )
+        constraint = sa.UniqueConstraint(article.c.name)
+        article.append_constraint(constraint)
+        assert has_unique_index(article.c.name)
+        article.constraints.discard(constraint)
+        del constraint
+        gc.collect()
+        article.append_constraint(sa.UniqueConstraint(article.c.slug))
+        assert not has_unique_index(article.c.name)
+        assert has_unique_index(article.c.slug)
+
     def test_compound_primary_key(self, article_translations):
         assert not has_unique_index(article_translations.c.id)
         assert not has_unique_index(article_translations.c.locale)